@@ -0,0 +1,51 @@
+"""
+Production gunicorn settings, used by the Procfile:
+
+    gunicorn config.wsgi -c config/gunicorn.conf.py
+
+The app is imported once in the master (`preload_app`) and warmed up before
+the workers are forked, so workers share the loaded modules copy-on-write
+instead of each importing Django, DRF and the admin again.
+"""
+import gc
+import multiprocessing
+from os import environ
+
+cpu_count: int = multiprocessing.cpu_count()
+
+preload_app: bool = environ.get('GUNICORN_PRELOAD', 'True') == 'True'
+
+# small dynos get a few threaded workers, larger machines the usual
+# (2 x cores) + 1 sync workers
+if cpu_count <= 2:
+    worker_class: str = environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+    workers: int = int(environ.get('WEB_CONCURRENCY', cpu_count + 1))
+    threads: int = int(environ.get('GUNICORN_THREADS', 4))
+else:
+    worker_class: str = environ.get('GUNICORN_WORKER_CLASS', 'sync')
+    workers: int = int(environ.get('WEB_CONCURRENCY', cpu_count * 2 + 1))
+    threads: int = int(environ.get('GUNICORN_THREADS', 1))
+
+bind: str = f'0.0.0.0:{environ.get("PORT", "8000")}'
+timeout: int = int(environ.get('GUNICORN_TIMEOUT', 30))
+keepalive: int = int(environ.get('GUNICORN_KEEPALIVE', 5))
+max_requests: int = int(environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter: int = int(environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+accesslog: str = '-'
+errorlog: str = '-'
+
+
+def when_ready(server):
+    """Runs in the master after the app is loaded, before the first fork."""
+    # honour --preload / --no-preload given on the command line too
+    if not server.cfg.preload_app:
+        return
+
+    from config.warmup import warm_up
+
+    warm_up()
+    # move everything loaded so far out of the GC's reach so collections in
+    # the workers don't touch (and copy) the shared pages
+    gc.collect()
+    gc.freeze()
+    server.log.info('Application warmed up before fork')
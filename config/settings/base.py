@@ -24,6 +24,10 @@ ADMIN_SITE_TITLE = environ.get('ADMIN_SITE_TITLE', 'E.R.S Admins')
 ADMIN_INDEX_TITLE = environ.get('ADMIN_INDEX_TITLE', 'JhapTech Administration')
 
 
+# domain part of iCalendar event UIDs; must stay stable across hosts
+CALENDAR_UID_DOMAIN = environ.get('CALENDAR_UID_DOMAIN', 'ers.local')
+
+
 # Application definition
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -35,6 +35,17 @@ DATABASES: dict[str, dict[str, str]] = {
     }
 }
 
+# cache shared by all workers; table change versions used for feed ETags
+# (events/versions.py) must not be per-process.
+# DatabaseCache needs `python manage.py createcachetable`
+CACHES: dict[str, dict[str, str]] = {
+    'default': {
+        'BACKEND': get_env_value(
+            'CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': get_env_value('CACHE_LOCATION', 'django_cache'),
+    }
+}
+
 # ensure production uses safe default
 AUTH_USER_MODEL: str = environ.get('AUTH_USER_MODEL', 'auth.User')
 
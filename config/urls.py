@@ -1,5 +1,4 @@
-import importlib
-
+from django.apps import apps
 from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
@@ -16,10 +15,9 @@ urlpatterns = [
     path('api-token-auth/', obtain_auth_token, name='api_token_auth'),
 ]
 
-try:
-    importlib.import_module('api.urls')
+if apps.is_installed('api'):
     urlpatterns.append(path('api/', include('api.urls')))
-except ModuleNotFoundError:
+else:
     # expose events API under /api/ if no api app
     urlpatterns.append(path('api/', include('events.urls')))
 
@@ -0,0 +1,42 @@
+import logging
+
+from django.conf import settings
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+# templates rendered by the events app
+TEMPLATES: tuple[str, ...] = ('index.html', 'register.html', '404.html')
+
+
+def warm_up() -> None:
+    """
+    Load what every request needs once, in the gunicorn master, so forked
+    workers start with it in shared memory.
+
+    Expects Django to be set up already (the WSGI application is loaded).
+    """
+    # import every view module and build the reverse lookup tables
+    resolver = get_resolver(settings.ROOT_URLCONF)
+    resolver.reverse_dict
+
+    for name in TEMPLATES:
+        try:
+            get_template(name)
+        except TemplateDoesNotExist:
+            logger.warning('warm-up: template %s not found', name)
+
+    # populate model _meta and DRF field mappings
+    from events.serializers import (EventSerializer,
+                                    RegistrationRollupSerializer,
+                                    RegistrationSerializer)
+
+    for serializer_class in (EventSerializer, RegistrationSerializer,
+                             RegistrationRollupSerializer):
+        serializer_class().fields
+
+    # connections must not be shared between forked workers
+    connections.close_all()
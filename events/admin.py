@@ -1,13 +1,49 @@
 from django.contrib import admin
-from .models import Event, Registration
+from .models import (ArchivedRegistration, CalendarKey, Event,
+                     Registration, RegistrationEvent, RegistrationRollup,
+                     SeatPool)
+
+
+class SeatPoolInline(admin.TabularInline):
+    model = SeatPool
+    extra = 0
+    filter_horizontal = ('members',)
+    readonly_fields = ('seats_taken',)
 
 
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
     list_display = ('title', 'start_time', 'end_time',
-                    'capacity', 'spots_left', 'created_by')
+                    'capacity', 'overbook_percent', 'spots_left',
+                    'created_by')
+    readonly_fields = ('reserved_seats', 'general_taken')
+    inlines = [SeatPoolInline]
 
 
 @admin.register(Registration)
 class RegistrationAdmin(admin.ModelAdmin):
-    list_display = ('user', 'event', 'registered_at')
+    list_display = ('user', 'event', 'pool', 'registered_at')
+
+
+@admin.register(ArchivedRegistration)
+class ArchivedRegistrationAdmin(admin.ModelAdmin):
+    list_display = ('user', 'event', 'registered_at', 'archived_at')
+    list_select_related = ('user', 'event')
+
+
+@admin.register(RegistrationEvent)
+class RegistrationEventAdmin(admin.ModelAdmin):
+    list_display = ('occurred_at', 'action', 'user', 'event')
+    list_select_related = ('user', 'event')
+
+
+@admin.register(RegistrationRollup)
+class RegistrationRollupAdmin(admin.ModelAdmin):
+    list_display = ('event', 'hour', 'registrations', 'cancellations')
+    list_select_related = ('event',)
+
+
+@admin.register(CalendarKey)
+class CalendarKeyAdmin(admin.ModelAdmin):
+    list_display = ('user', 'created')
+    list_select_related = ('user',)
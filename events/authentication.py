@@ -0,0 +1,32 @@
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from .models import CalendarKey
+
+
+class CalendarKeyAuthentication(BaseAuthentication):
+    """
+    Authenticate with a calendar key from the `?key=` query parameter.
+
+    Calendar apps subscribe to a URL and cannot send an Authorization header.
+    The key is feed-only and revocable; use it solely on the .ics views so a
+    leaked feed URL never grants access to the rest of the API.
+    """
+
+    def authenticate(self, request):
+        key = request.query_params.get('key')
+        if not key:
+            return None
+
+        try:
+            calendar_key = CalendarKey.objects.select_related('user').get(
+                key=key)
+        except CalendarKey.DoesNotExist:
+            raise AuthenticationFailed('Invalid calendar key.')
+
+        if not calendar_key.user.is_active:
+            raise AuthenticationFailed('User inactive or deleted.')
+        return (calendar_key.user, calendar_key)
+
+    def authenticate_header(self, request):
+        return 'CalendarKey'
@@ -0,0 +1,147 @@
+"""
+Event capacity engine.
+
+An event sells `capacity_limit` seats (capacity plus the overbooking
+allowance). Seat pools reserve part of them for their members; everyone else
+shares the remaining general seats. The counters on `Event` and `SeatPool`
+are kept in step with registrations by the signal handlers in
+events/signals.py and can be rebuilt in bulk with `recompute_seats()`.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import (ArchivedRegistration, Event, Registration, SeatPool,
+                     capacity_limit)
+
+_counters_suspended: ContextVar[bool] = ContextVar(
+    'counters_suspended', default=False)
+
+
+class CapacityError(Exception):
+    """Raised when a capacity change conflicts with seats already taken."""
+
+
+def check_capacity(event: Event, capacity: int, overbook_percent: int) -> None:
+    """
+    Validate new capacity settings against the event's live counters.
+
+    Call with the event row locked (`select_for_update`) so no registration
+    can slip in between the check and the update.
+    """
+    needed = event.reserved_seats + event.general_taken
+    limit = capacity_limit(capacity, overbook_percent)
+    if limit < needed:
+        raise CapacityError(
+            f'capacity cannot be lower than the {needed} seats already '
+            f'taken or reserved')
+
+
+def check_pool(event: Event, pool: SeatPool) -> None:
+    """
+    Validate a new or resized seat pool against the event's live counters.
+
+    Like `check_capacity`, call with the event row locked.
+    """
+    # read seats_taken from the row, the instance may be stale
+    taken = 0
+    if pool.pk is not None:
+        taken = SeatPool.objects.filter(pk=pool.pk).values_list(
+            'seats_taken', flat=True).first() or 0
+    other_seats = event.seat_pools.exclude(pk=pool.pk).aggregate(
+        total=Sum('seats'))['total'] or 0
+
+    if pool.seats < taken:
+        raise CapacityError(
+            f'pool seats cannot be lower than the {taken} seats already '
+            f'taken from it')
+
+    needed = other_seats + pool.seats + event.general_taken
+    if event.capacity_limit < needed:
+        raise CapacityError(
+            f'pool needs {needed - event.capacity_limit} more seat(s) than '
+            f'the event has free')
+
+
+def choose_pool(event: Event, user) -> SeatPool | None:
+    """Return a pool of `event` with a free seat that `user` belongs to."""
+    return event.seat_pools.filter(
+        members=user, seats_taken__lt=F('seats')).order_by('pk').first()
+
+
+def has_seat_for(event: Event, user) -> tuple[bool, SeatPool | None]:
+    """Whether `user` can get a seat, and the pool it would come from."""
+    pool = choose_pool(event, user) if event.reserved_seats else None
+    return pool is not None or event.spots_left > 0, pool
+
+
+@contextmanager
+def counters_suspended():
+    """
+    Skip counter updates for registrations saved or deleted in this block,
+    e.g. when moving rows to the archive table.
+    """
+    token = _counters_suspended.set(True)
+    try:
+        yield
+    finally:
+        _counters_suspended.reset(token)
+
+
+def adjust_counters(registration, delta: int) -> None:
+    """Add `delta` to the counter the registration's seat belongs to."""
+    if _counters_suspended.get():
+        return
+    if registration.pool_id:
+        SeatPool.objects.filter(pk=registration.pool_id).update(
+            seats_taken=_shifted('seats_taken', delta))
+    else:
+        Event.objects.filter(pk=registration.event_id).update(
+            general_taken=_shifted('general_taken', delta))
+
+
+def _shifted(field: str, delta: int):
+    """
+    `field + delta`, floored at 0 so a drifted counter can't make a
+    cancellation violate the column's CHECK constraint.
+    """
+    if delta >= 0:
+        return F(field) + delta
+    return Greatest(F(field) + delta, 0)
+
+
+def _count(model, group: str, **filters) -> Coalesce:
+    """Correlated COUNT of `model` rows whose `group` is the outer row."""
+    counts = model.objects.filter(
+        **{group: OuterRef('pk')}, **filters,
+    ).order_by().values(group).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def recompute_seats(events=None) -> int:
+    """
+    Rebuild seat counters from the registration tables with set-based
+    UPDATEs. Archived registrations still hold their seats.
+
+    `events` restricts the update to a queryset of events; returns the
+    number of events updated.
+    """
+    if events is None:
+        events = Event.objects.all()
+    event_ids = events.values('pk')
+
+    SeatPool.objects.filter(event__in=event_ids).update(
+        seats_taken=(_count(Registration, 'pool')
+                     + _count(ArchivedRegistration, 'pool')))
+
+    reserved = SeatPool.objects.filter(event=OuterRef('pk')).order_by(
+    ).values('event').annotate(total=Sum('seats')).values('total')
+    return Event.objects.filter(pk__in=event_ids).update(
+        reserved_seats=Coalesce(
+            Subquery(reserved, output_field=IntegerField()), 0),
+        general_taken=(
+            _count(Registration, 'event', pool__isnull=True)
+            + _count(ArchivedRegistration, 'event', pool__isnull=True)),
+    )
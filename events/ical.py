@@ -0,0 +1,87 @@
+"""
+Minimal iCalendar (RFC 5545) rendering for event feeds.
+"""
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timezone
+
+from django.conf import settings
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+PRODID = '-//E.R.S//Event Registration System//EN'
+
+
+class ICalendarRenderer(BaseRenderer):
+    """Lets DRF content negotiation accept `text/calendar` requests."""
+    media_type = 'text/calendar'
+    format = 'ics'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, (str, bytes)):
+            return data
+
+        # error responses (401, 403, ...) carry a dict; send it as JSON
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = 'application/json'
+        return JSONRenderer().render(data)
+
+
+def escape(value: str) -> str:
+    return (value.replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def fold(line: str) -> str:
+    """Fold a content line to 75 octets as required by RFC 5545."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+
+    parts: list[str] = []
+    current = ''
+    limit = 75
+    for char in line:
+        if len((current + char).encode('utf-8')) > limit:
+            parts.append(current)
+            current = ''
+            # continuation lines start with a space
+            limit = 74
+        current += char
+    parts.append(current)
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def format_dt(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def render_event(event) -> str:
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:event-{event.pk}@{settings.CALENDAR_UID_DOMAIN}',
+        # no modification timestamp is stored; start time keeps the output
+        # byte-identical for a given table version (strong ETag)
+        f'DTSTAMP:{format_dt(event.start_time)}',
+        f'DTSTART:{format_dt(event.start_time)}',
+        f'DTEND:{format_dt(event.end_time)}',
+        f'SUMMARY:{escape(event.title)}',
+        f'LOCATION:{escape(event.location)}',
+        f'DESCRIPTION:{escape(event.description)}',
+        'END:VEVENT',
+    ]
+    return ''.join(fold(line) for line in lines)
+
+
+def render_calendar(events: Iterable, name: str) -> Iterator[str]:
+    """Yield a VCALENDAR one event at a time, suitable for streaming."""
+    yield ''.join(fold(line) for line in (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        f'X-WR-CALNAME:{escape(name)}',
+    ))
+    for event in events:
+        yield render_event(event)
+    yield fold('END:VCALENDAR')
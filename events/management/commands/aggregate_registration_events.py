@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from events.rollups import aggregate_batch
+
+
+class Command(BaseCommand):
+    help = ('Fold new registration log rows into the hourly rollups, '
+            'starting after the stored watermark.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='number of log rows processed per transaction')
+        parser.add_argument(
+            '--lag-seconds', type=int, default=60,
+            help='leave log rows younger than this for the next run')
+
+    def handle(self, *args, **options):
+        batch_size: int = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError('--batch-size must be positive')
+        if options['lag_seconds'] < 0:
+            raise CommandError('--lag-seconds must be non-negative')
+        lag = timedelta(seconds=options['lag_seconds'])
+
+        processed = 0
+        while count := aggregate_batch(batch_size, lag):
+            processed += count
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Aggregated {processed} registration event(s)'))
@@ -0,0 +1,83 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from events.capacity import counters_suspended
+from events.models import ArchivedRegistration, Registration
+
+
+class Command(BaseCommand):
+    help = ('Move registrations for events that ended more than N days ago '
+            'into the archive table, in batches.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=30,
+            help='archive events that ended more than this many days ago')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='number of registrations moved per transaction')
+        parser.add_argument(
+            '--max-batches', type=int, default=None,
+            help='stop after this many batches (rerun to resume)')
+
+    def handle(self, *args, **options):
+        days: int = options['days']
+        batch_size: int = options['batch_size']
+        max_batches: int | None = options['max_batches']
+
+        if days < 0:
+            raise CommandError('--days must be non-negative')
+        if batch_size <= 0:
+            raise CommandError('--batch-size must be positive')
+
+        cutoff = timezone.now() - timedelta(days=days)
+        moved = 0
+        batches = 0
+
+        while max_batches is None or batches < max_batches:
+            count = archive_batch(cutoff, batch_size)
+            if not count:
+                break
+            moved += count
+            batches += 1
+            self.stdout.write(f'batch {batches}: archived {count}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {moved} registration(s) in {batches} batch(es)'))
+
+
+def archive_batch(cutoff, batch_size: int) -> int:
+    """
+    Copy one batch of registrations for events ending before `cutoff` into
+    `ArchivedRegistration` and delete them from the hot table.
+
+    Each batch runs in its own transaction, so an interrupted run simply
+    resumes from the rows still left in `Registration`. Archived rows keep
+    their seats, so the seat counters are left untouched.
+    """
+    with transaction.atomic(), counters_suspended():
+        rows = list(
+            Registration.objects
+            .filter(event__end_time__lt=cutoff)
+            .order_by('pk')
+            .values('pk', 'user_id', 'event_id', 'pool_id',
+                    'registered_at')[:batch_size]
+        )
+        if not rows:
+            return 0
+
+        ArchivedRegistration.objects.bulk_create(
+            [ArchivedRegistration(registration_id=row['pk'],
+                                  user_id=row['user_id'],
+                                  event_id=row['event_id'],
+                                  pool_id=row['pool_id'],
+                                  registered_at=row['registered_at'])
+             for row in rows],
+            ignore_conflicts=True,
+        )
+        Registration.objects.filter(
+            pk__in=[row['pk'] for row in rows]).delete()
+        return len(rows)
@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# imports the WSGI application the way a gunicorn worker does
+STARTUP_SCRIPT: str = (
+    'from django.core.wsgi import get_wsgi_application; '
+    'get_wsgi_application(); '
+    'from django.urls import get_resolver; get_resolver().url_patterns'
+)
+
+
+def parse_importtime(output: str) -> list[tuple[str, int, int]]:
+    """
+    Parse `python -X importtime` output into (module, self_us, cumulative_us)
+    rows.
+    """
+    rows: list[tuple[str, int, int]] = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        try:
+            self_us, cumulative_us, module = line[len('import time:'):].split(
+                '|', 2)
+            rows.append((module.strip(), int(self_us), int(cumulative_us)))
+        except ValueError:
+            # header line
+            continue
+    return rows
+
+
+class Command(BaseCommand):
+    help = ('Report a per-module import-time breakdown of the application '
+            'startup, measured in a fresh interpreter.')
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=25,
+            help='number of modules to show')
+        parser.add_argument(
+            '--sort', choices=('self', 'cumulative'), default='cumulative',
+            help='order by time spent in the module itself or including '
+                 'its imports')
+        parser.add_argument(
+            '--prefix', default='',
+            help='only show modules whose name starts with this prefix')
+
+    def handle(self, *args, **options):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+            capture_output=True, text=True, env=env, cwd=settings.BASE_DIR)
+        if result.returncode != 0:
+            raise CommandError(f'startup failed:\n{result.stderr}')
+
+        rows = parse_importtime(result.stderr)
+        module_count = len(rows)
+        total_us = sum(self_us for _, self_us, _ in rows)
+        if options['prefix']:
+            rows = [row for row in rows
+                    if row[0].startswith(options['prefix'])]
+        key = 1 if options['sort'] == 'self' else 2
+        rows.sort(key=lambda row: row[key], reverse=True)
+
+        self.stdout.write(f'{"self ms":>10} {"cumul ms":>10}  module')
+        for module, self_us, cumulative_us in rows[:options['limit']]:
+            self.stdout.write(
+                f'{self_us / 1000:>10.1f} {cumulative_us / 1000:>10.1f}  '
+                f'{module}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Total import time: {total_us / 1000:.1f} ms '
+            f'({module_count} modules)'))
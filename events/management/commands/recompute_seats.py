@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+
+from events.capacity import recompute_seats
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the seat counters of events and seat pools from the '
+            'registration tables using set-based UPDATEs.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='number of event ids covered by each UPDATE')
+
+    def handle(self, *args, **options):
+        batch_size: int = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError('--batch-size must be positive')
+
+        last_pk = Event.objects.aggregate(last=Max('pk'))['last'] or 0
+        updated = 0
+        # walk pk ranges so each transaction locks a bounded set of rows
+        for start in range(0, last_pk + 1, batch_size):
+            with transaction.atomic():
+                updated += recompute_seats(Event.objects.filter(
+                    pk__gte=start, pk__lt=start + batch_size))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Recomputed seats for {updated} event(s)'))
@@ -1,5 +1,33 @@
+import secrets
+
 from django.conf import settings
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator
+from django.db import models, transaction
+
+
+def capacity_limit(capacity: int, overbook_percent: int) -> int:
+    """Capacity including the overbooking allowance."""
+    return capacity + capacity * overbook_percent // 100
+
+
+def exclude_counters(instance: models.Model, save_kwargs: dict,
+                     exists: bool = True) -> dict:
+    """
+    Limit an update of `instance` to its non-counter fields unless the
+    caller chose `update_fields` itself.
+
+    `exists` is False when the row was deleted meanwhile; the save is then
+    left unrestricted so it re-inserts the row as a plain `save()` would.
+    """
+    if instance._state.adding or not exists \
+            or save_kwargs.get('update_fields') is not None \
+            or save_kwargs.get('force_insert'):
+        return save_kwargs
+    fields = [field.name for field in instance._meta.concrete_fields
+              if not field.primary_key
+              and field.name not in instance.counter_fields]
+    return {**save_kwargs, 'update_fields': fields}
 
 
 class Event(models.Model):
@@ -9,28 +37,126 @@ class Event(models.Model):
     start_time = models.DateTimeField()
     end_time = models.DateTimeField()
     capacity = models.PositiveIntegerField()
+    # extra seats sold on top of capacity, as a percentage of capacity
+    overbook_percent = models.PositiveSmallIntegerField(
+        default=0, validators=[MaxValueValidator(100)])
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         related_name="organized_events"
     )
 
+    # denormalized seat counters, maintained by events/capacity.py and
+    # rebuilt by the `recompute_seats` command
+    reserved_seats = models.PositiveIntegerField(default=0, editable=False)
+    general_taken = models.PositiveIntegerField(default=0, editable=False)
+
+    # written only through F() updates; a stale instance must not overwrite
+    counter_fields: tuple[str, ...] = ('reserved_seats', 'general_taken')
+
     def __str__(self) -> str:
         return self.title
 
+    def clean(self):
+        from .capacity import CapacityError, check_capacity
+
+        if self.pk is None:
+            return
+        # check the edited capacity against the live counters
+        live = Event.objects.filter(pk=self.pk).only(
+            'reserved_seats', 'general_taken').first()
+        if live is None:
+            return
+        try:
+            check_capacity(live, self.capacity, self.overbook_percent)
+        except CapacityError as ce:
+            raise ValidationError({'capacity': str(ce)})
+
+    def save(self, *args, **kwargs):
+        from .capacity import check_capacity
+
+        if self._state.adding:
+            super().save(*args, **kwargs)
+            return
+
+        # capacity reductions are validated against the live counters with
+        # the row locked, so no registration slips in between
+        with transaction.atomic():
+            live = Event.objects.select_for_update().filter(
+                pk=self.pk).first()
+            if live is not None:
+                check_capacity(live, self.capacity, self.overbook_percent)
+            super().save(*args, **exclude_counters(
+                self, kwargs, exists=live is not None))
+
+    @property
+    def capacity_limit(self) -> int:
+        """Capacity including the overbooking allowance."""
+        return capacity_limit(self.capacity, self.overbook_percent)
+
     @property
     def spots_left(self) -> int:
         """
-        Number of free spots remaining. Never returns negative.
+        Number of free general (non-reserved) spots remaining. Never returns
+        negative.
 
-        Uses related_name 'registrations' on Registration to count current
-        registrations.
+        Seats held by seat pools are excluded, whether taken or not.
         """
-        taken = self.registrations.count()
-        remaining = self.capacity - taken
+        remaining = (self.capacity_limit - self.reserved_seats
+                     - self.general_taken)
         return max(0, remaining)
 
 
+class SeatPool(models.Model):
+    """
+    Seats of an event reserved for a group of users (e.g. staff or VIPs).
+    Members register into the pool while it has free seats.
+    """
+    event = models.ForeignKey(
+        Event, on_delete=models.CASCADE, related_name='seat_pools'
+    )
+    name = models.CharField(max_length=100)
+    seats = models.PositiveIntegerField()
+    members = models.ManyToManyField(
+        settings.AUTH_USER_MODEL, blank=True, related_name='seat_pools'
+    )
+    seats_taken = models.PositiveIntegerField(default=0, editable=False)
+
+    counter_fields: tuple[str, ...] = ('seats_taken',)
+
+    class Meta:
+        unique_together = ('event', 'name')
+
+    def __str__(self) -> str:
+        return f'{self.event.title}: {self.name}'
+
+    def clean(self):
+        from .capacity import CapacityError, check_pool
+
+        if self.event_id is None:
+            return
+        # keep the (possibly edited) capacity, refresh the live counter
+        event = self.event
+        event.general_taken = Event.objects.filter(
+            pk=self.event_id).values_list('general_taken', flat=True).get()
+        try:
+            check_pool(event, self)
+        except CapacityError as ce:
+            raise ValidationError({'seats': str(ce)})
+
+    def save(self, *args, **kwargs):
+        from .capacity import check_pool
+
+        # growing a pool takes general seats: validate against the live
+        # counters with the event row locked, like a capacity change
+        with transaction.atomic():
+            event = Event.objects.select_for_update().get(pk=self.event_id)
+            check_pool(event, self)
+            exists = not self._state.adding and \
+                SeatPool.objects.filter(pk=self.pk).exists()
+            super().save(*args, **exclude_counters(self, kwargs, exists))
+
+
 class Registration(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -40,6 +166,11 @@ class Registration(models.Model):
     event = models.ForeignKey(
         Event, on_delete=models.CASCADE, related_name='registrations'
     )
+    # reserved pool the seat was taken from; general admission when null
+    pool = models.ForeignKey(
+        SeatPool, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='registrations'
+    )
     registered_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -49,3 +180,116 @@ class Registration(models.Model):
 
     def __str__(self) -> str:
         return f'{self.user} -> {self.event.title}'
+
+
+class ArchivedRegistration(models.Model):
+    """
+    Registration moved out of the hot `Registration` table once its event
+    has ended. Populated by the `archive_registrations` command.
+    """
+    # primary key of the row in `Registration`; makes archiving idempotent
+    registration_id = models.BigIntegerField(unique=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='archived_registrations'
+    )
+    event = models.ForeignKey(
+        Event, on_delete=models.CASCADE,
+        related_name='archived_registrations'
+    )
+    pool = models.ForeignKey(
+        SeatPool, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='archived_registrations'
+    )
+    registered_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-registered_at']
+        indexes = [models.Index(fields=['user', '-registered_at'])]
+
+    def __str__(self) -> str:
+        return f'{self.user} -> {self.event.title} (archived)'
+
+
+class RegistrationEvent(models.Model):
+    """
+    Append-only log of registrations and cancellations, aggregated into
+    `RegistrationRollup` by the `aggregate_registration_events` command.
+    """
+    REGISTERED = 'registered'
+    CANCELLED = 'cancelled'
+    ACTION_CHOICES = [
+        (REGISTERED, 'Registered'),
+        (CANCELLED, 'Cancelled'),
+    ]
+
+    event = models.ForeignKey(
+        Event, on_delete=models.CASCADE, related_name='registration_events'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL, null=True,
+        related_name='registration_events'
+    )
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    occurred_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['pk']
+
+    def __str__(self) -> str:
+        return f'{self.user} {self.action} {self.event_id}'
+
+
+class RegistrationRollup(models.Model):
+    """Registrations and cancellations of an event per hour."""
+    event = models.ForeignKey(
+        Event, on_delete=models.CASCADE, related_name='rollups'
+    )
+    hour = models.DateTimeField()
+    registrations = models.PositiveIntegerField(default=0)
+    cancellations = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('event', 'hour')
+        ordering = ['hour']
+
+    def __str__(self) -> str:
+        return f'{self.event_id} @ {self.hour:%Y-%m-%d %H:00}'
+
+
+class RollupWatermark(models.Model):
+    """Last `RegistrationEvent` id folded into the rollups."""
+    name = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f'{self.name}: {self.last_id}'
+
+
+class CalendarKey(models.Model):
+    """
+    Secret for a user's personal calendar feed. Grants read access to that
+    feed only; rotate or delete it to revoke subscribed calendar apps.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='calendar_key'
+    )
+    key = models.CharField(max_length=64, unique=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f'calendar key of {self.user}'
+
+    def save(self, *args, **kwargs):
+        if not self.key:
+            self.key = self.generate_key()
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def generate_key() -> str:
+        return secrets.token_urlsafe(32)
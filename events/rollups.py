@@ -0,0 +1,85 @@
+"""
+Incremental aggregation of the `RegistrationEvent` log into hourly
+`RegistrationRollup` rows.
+
+Each run folds in only the log rows after the stored watermark. Rows newer
+than `lag` are left for the next run, so a transaction that got its id
+before, but committed after, a later one is not skipped.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import RegistrationEvent, RegistrationRollup, RollupWatermark
+
+WATERMARK_NAME = 'registration_events'
+
+
+def aggregate_batch(batch_size: int, lag: timedelta) -> int:
+    """
+    Fold up to `batch_size` new log rows into the rollups and advance the
+    watermark, in one transaction. Returns the number of log rows processed.
+    """
+    with transaction.atomic():
+        RollupWatermark.objects.get_or_create(name=WATERMARK_NAME)
+        # the row lock makes concurrent runs take turns
+        watermark = RollupWatermark.objects.select_for_update().get(
+            name=WATERMARK_NAME)
+
+        ids = list(RegistrationEvent.objects.filter(
+            pk__gt=watermark.last_id,
+            occurred_at__lte=timezone.now() - lag,
+        ).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return 0
+
+        buckets = RegistrationEvent.objects.filter(
+            pk__gt=watermark.last_id, pk__lte=ids[-1],
+        ).annotate(hour=TruncHour('occurred_at')).order_by().values(
+            'event_id', 'hour',
+        ).annotate(
+            registrations=Count(
+                'pk', filter=Q(action=RegistrationEvent.REGISTERED)),
+            cancellations=Count(
+                'pk', filter=Q(action=RegistrationEvent.CANCELLED)),
+        )
+        merge_buckets(list(buckets))
+
+        watermark.last_id = ids[-1]
+        watermark.save(update_fields=['last_id'])
+        return len(ids)
+
+
+def merge_buckets(buckets: list[dict]) -> None:
+    """Add per (event, hour) counts to existing rollups or create them."""
+    if not buckets:
+        return
+
+    keys = {(bucket['event_id'], bucket['hour']) for bucket in buckets}
+    existing = {
+        (rollup.event_id, rollup.hour): rollup
+        for rollup in RegistrationRollup.objects.filter(
+            event_id__in={event_id for event_id, _ in keys},
+            hour__in={hour for _, hour in keys})
+    }
+
+    to_create: list[RegistrationRollup] = []
+    to_update: list[RegistrationRollup] = []
+    for bucket in buckets:
+        rollup = existing.get((bucket['event_id'], bucket['hour']))
+        if rollup is None:
+            to_create.append(RegistrationRollup(
+                event_id=bucket['event_id'], hour=bucket['hour'],
+                registrations=bucket['registrations'],
+                cancellations=bucket['cancellations']))
+        else:
+            rollup.registrations += bucket['registrations']
+            rollup.cancellations += bucket['cancellations']
+            to_update.append(rollup)
+
+    RegistrationRollup.objects.bulk_create(to_create)
+    RegistrationRollup.objects.bulk_update(
+        to_update, ['registrations', 'cancellations'])
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
-from .models import Event, Registration
+from .capacity import CapacityError
+from .models import Event, Registration, RegistrationRollup
 
 
 class EventSerializer(serializers.ModelSerializer):
@@ -16,12 +17,45 @@ class EventSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError('capacity must be non-negative!')
         return value
 
+    def update(self, instance, validated_data):
+        # Event.save() checks capacity changes under a row lock
+        try:
+            return super().update(instance, validated_data)
+        except CapacityError as ce:
+            raise serializers.ValidationError({'capacity': str(ce)})
+
 
 class RegistrationSerializer(serializers.ModelSerializer):
     user = serializers.ReadOnlyField(source='user.username')
     event = serializers.PrimaryKeyRelatedField(read_only=True)
+    archived = serializers.SerializerMethodField()
 
     class Meta:
         model = Registration
         fields = '__all__'
         read_only_fields = ['user', 'registered_at']
+
+    def get_archived(self, obj) -> bool:
+        return False
+
+
+class RegistrationRowSerializer(serializers.Serializer):
+    """
+    Row of the live + archived registrations listing; same shape as
+    `RegistrationSerializer`.
+    """
+    id = serializers.IntegerField(source='reg_id')
+    user = serializers.SerializerMethodField()
+    event = serializers.IntegerField(source='event_ref')
+    pool = serializers.IntegerField(source='pool_ref', allow_null=True)
+    registered_at = serializers.DateTimeField(source='registered_on')
+    archived = serializers.BooleanField()
+
+    def get_user(self, row) -> str:
+        return self.context['request'].user.username
+
+
+class RegistrationRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RegistrationRollup
+        fields = ['hour', 'registrations', 'cancellations']
@@ -0,0 +1,35 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .capacity import adjust_counters, recompute_seats
+from .models import Event, Registration, SeatPool
+from .versions import bump_on_commit, user_registrations_table
+
+
+@receiver([post_save, post_delete], sender=Event)
+def event_changed(sender, **kwargs):
+    bump_on_commit('event')
+
+
+@receiver([post_save, post_delete], sender=Registration)
+def registration_changed(sender, instance, **kwargs):
+    # per user, so one user's change doesn't invalidate everyone's feed
+    bump_on_commit(user_registrations_table(instance.user_id))
+
+
+@receiver(post_save, sender=Registration)
+def registration_created(sender, instance, created, **kwargs):
+    if created:
+        adjust_counters(instance, 1)
+
+
+@receiver(post_delete, sender=Registration)
+def registration_deleted(sender, instance, **kwargs):
+    adjust_counters(instance, -1)
+
+
+@receiver([post_save, post_delete], sender=SeatPool)
+def seat_pool_changed(sender, instance, **kwargs):
+    # pool size changes move seats between reserved and general admission
+    recompute_seats(Event.objects.filter(pk=instance.event_id))
+    bump_on_commit('event')
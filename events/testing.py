@@ -0,0 +1,133 @@
+"""
+Query-count and latency budgets for tests.
+
+Wrap a block of test code in `query_budget(...)` (or decorate a test method
+with it) to fail the test when the block runs more queries, more duplicate
+queries or takes longer than allowed. The failure message lists the SQL that
+was executed so the offending N+1 can be spotted straight from the CI log.
+"""
+import functools
+import time
+from collections import Counter
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class BudgetExceeded(AssertionError):
+    """Raised when a block exceeds its query or latency budget."""
+
+
+class query_budget:
+    """
+    Context manager / decorator asserting a performance budget.
+
+    - `max_queries`: maximum number of SQL queries executed.
+    - `max_duplicates`: maximum number of repeated executions of the same SQL
+      statement (same text and parameters). 0 forbids any repeat.
+    - `max_seconds`: maximum wall time of the block.
+
+    Any limit left as None is not checked.
+    """
+
+    def __init__(self, max_queries: int | None = None,
+                 max_duplicates: int | None = 0,
+                 max_seconds: float | None = None,
+                 using: str = DEFAULT_DB_ALIAS,
+                 label: str = ''):
+        self.max_queries = max_queries
+        self.max_duplicates = max_duplicates
+        self.max_seconds = max_seconds
+        self.using = using
+        self.label = label
+        self.context: CaptureQueriesContext | None = None
+        self.started: float = 0.0
+        self.elapsed: float = 0.0
+
+    def __enter__(self):
+        self.context = CaptureQueriesContext(connections[self.using])
+        self.context.__enter__()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.elapsed = time.perf_counter() - self.started
+        self.context.__exit__(exc_type, exc_value, traceback)
+        if exc_type is None:
+            self.check()
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.__class__(self.max_queries, self.max_duplicates,
+                                self.max_seconds, self.using,
+                                self.label or func.__qualname__):
+                return func(*args, **kwargs)
+        return wrapper
+
+    @property
+    def queries(self) -> list[str]:
+        return [query['sql'] for query in self.context.captured_queries]
+
+    @property
+    def duplicates(self) -> dict[str, int]:
+        """Map of SQL statement -> number of extra executions."""
+        counts = Counter(self.queries)
+        return {sql: n - 1 for sql, n in counts.items() if n > 1}
+
+    def check(self) -> None:
+        problems: list[str] = []
+
+        if self.max_queries is not None and \
+                len(self.queries) > self.max_queries:
+            problems.append(f'{len(self.queries)} queries executed, '
+                            f'budget is {self.max_queries}')
+
+        duplicate_count = sum(self.duplicates.values())
+        if self.max_duplicates is not None and \
+                duplicate_count > self.max_duplicates:
+            problems.append(f'{duplicate_count} duplicate queries, '
+                            f'budget is {self.max_duplicates}')
+
+        if self.max_seconds is not None and self.elapsed > self.max_seconds:
+            problems.append(f'took {self.elapsed:.3f}s, '
+                            f'budget is {self.max_seconds:.3f}s')
+
+        if problems:
+            raise BudgetExceeded(self.report(problems))
+
+    def report(self, problems: list[str]) -> str:
+        header = f'Budget exceeded for {self.label}' if self.label \
+            else 'Budget exceeded'
+        lines = [f'{header}: ' + '; '.join(problems), 'Queries:']
+        lines += [f'  {i}. {sql}' for i, sql in enumerate(self.queries, 1)]
+        if self.duplicates:
+            lines.append('Duplicated:')
+            lines += [f'  x{n + 1} {sql}'
+                      for sql, n in self.duplicates.items()]
+        return '\n'.join(lines)
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin for checking per-endpoint budgets.
+
+    Subclasses declare `budgets` as a mapping of name -> dict of
+    `query_budget` keyword arguments, then call
+    `self.assertWithinBudget(name, callable)`. The names checked so far are
+    recorded in `exercised_budgets`.
+    """
+    budgets: dict[str, dict] = {}
+    default_budget: dict = {'max_duplicates': 0}
+
+    def assertWithinBudget(self, name: str, func, *args, **kwargs):
+        if name not in self.budgets:
+            raise AssertionError(f'no budget declared for {name}')
+        if not hasattr(self, 'exercised_budgets'):
+            self.exercised_budgets: set[str] = set()
+        self.exercised_budgets.add(name)
+
+        budget = {**self.default_budget, **self.budgets[name]}
+        with query_budget(label=name, **budget):
+            return func(*args, **kwargs)
@@ -1,11 +1,23 @@
+import time
 from datetime import datetime, timedelta, timezone
+from io import StringIO
 
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient, APITestCase
 
-from .models import Event, Registration
+from .capacity import CapacityError, recompute_seats
+from .management.commands.importtime import parse_importtime
+from .models import (ArchivedRegistration, CalendarKey, Event,
+                     Registration, RegistrationEvent, RegistrationRollup,
+                     SeatPool)
+from .testing import BudgetExceeded, QueryBudgetMixin, query_budget
+from .urls import urlpatterns
 
 User = get_user_model()
 
@@ -74,3 +86,602 @@ class EventAPITestCase(APITestCase):
         response = self.client.post(register_url)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('Event is full', response.json().get('error', ''))
+
+
+class ArchiveRegistrationsTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='user1', password='pass123')
+        self.organizer = User.objects.create_user(
+            username='org1', password='pass123', is_staff=True)
+
+        now = datetime.now(timezone.utc)
+        self.past_event = Event.objects.create(
+            title='Past Event', description='desc', location='online',
+            start_time=now - timedelta(days=61),
+            end_time=now - timedelta(days=60),
+            capacity=10, created_by=self.organizer)
+        self.future_event = Event.objects.create(
+            title='Future Event', description='desc', location='online',
+            start_time=now + timedelta(days=1),
+            end_time=now + timedelta(days=1, hours=1),
+            capacity=10, created_by=self.organizer)
+        self.past_reg = Registration.objects.create(
+            user=self.user, event=self.past_event)
+        Registration.objects.create(user=self.user, event=self.future_event)
+
+    def test_archive_moves_only_ended_events(self):
+        call_command('archive_registrations', days=30, batch_size=1,
+                     stdout=StringIO())
+
+        self.assertFalse(Registration.objects.filter(
+            event=self.past_event).exists())
+        self.assertTrue(Registration.objects.filter(
+            event=self.future_event).exists())
+        archived = ArchivedRegistration.objects.get()
+        self.assertEqual(archived.registration_id, self.past_reg.pk)
+        self.assertEqual(archived.registered_at, self.past_reg.registered_at)
+
+    def test_archived_registration_blocks_reregistering(self):
+        call_command('archive_registrations', days=30, stdout=StringIO())
+        self.client.login(username='user1', password='pass123')
+
+        response = self.client.post(reverse(
+            'events:event-register', kwargs={'pk': self.past_event.pk}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Registration.objects.filter(
+            user=self.user, event=self.past_event).exists())
+
+    def test_my_registrations_include_archived(self):
+        call_command('archive_registrations', days=30, stdout=StringIO())
+        self.client.login(username='user1', password='pass123')
+        url: str = reverse('events:my-registrations')
+
+        response = self.client.get(url)
+        self.assertEqual(response.json()['count'], 1)
+
+        response = self.client.get(url, {'include_archived': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()['results']
+        self.assertEqual([r['event'] for r in results],
+                         [self.future_event.pk, self.past_event.pk])
+        self.assertFalse(results[0]['archived'])
+        self.assertTrue(results[1]['archived'])
+        self.assertEqual(results[1]['id'], self.past_reg.pk)
+        self.assertEqual(results[1]['user'], 'user1')
+
+
+@override_settings(PASSWORD_HASHERS=[
+    'django.contrib.auth.hashers.MD5PasswordHasher'])
+class EndpointBudgetTestCase(QueryBudgetMixin, APITestCase):
+    """
+    Per-endpoint query and latency budgets on a seeded dataset. Every named
+    route in events/urls.py must have a budget.
+    """
+    budgets = {
+        'event-list': {'max_queries': 2, 'max_seconds': 1.0},
+        'event-detail': {'max_queries': 1, 'max_seconds': 0.5},
+        # the event row is read once before and once under the row lock
+        'event-register': {'max_queries': 11, 'max_duplicates': 1,
+                           'max_seconds': 0.5},
+        'event-cancel': {'max_queries': 6, 'max_seconds': 0.5},
+        'event-analytics': {'max_queries': 2, 'max_seconds': 0.5},
+        'my-registrations': {'max_queries': 2, 'max_seconds': 0.5},
+        'user-register': {'max_queries': 0, 'max_seconds': 0.5},
+        'home': {'max_queries': 0, 'max_seconds': 0.5},
+        'api-register': {'max_queries': 6, 'max_seconds': 0.5},
+        'api-token-for-user': {'max_queries': 4, 'max_seconds': 0.5},
+        'api-calendar-key': {'max_queries': 4, 'max_seconds': 0.5},
+        'events-ics': {'max_queries': 1, 'max_seconds': 1.0},
+        # calendar key lookup + events
+        'my-registrations-ics': {'max_queries': 2, 'max_seconds': 1.0},
+    }
+    event_count = 30
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='user1', password='pass123')
+        cls.organizer = User.objects.create_user(
+            username='org1', password='pass123', is_staff=True)
+        attendees = User.objects.bulk_create(
+            [User(username=f'attendee{i}') for i in range(10)])
+
+        now = datetime.now(timezone.utc)
+        cls.events = Event.objects.bulk_create([
+            Event(title=f'Event {i}', description='desc', location='online',
+                  start_time=now + timedelta(days=i),
+                  end_time=now + timedelta(days=i, hours=1),
+                  capacity=50, created_by=cls.organizer)
+            for i in range(cls.event_count)])
+        Registration.objects.bulk_create([
+            Registration(user=attendee, event=event)
+            for event in cls.events for attendee in attendees])
+        Registration.objects.bulk_create([
+            Registration(user=cls.user, event=event)
+            for event in cls.events[1:]])
+        recompute_seats()
+
+    def test_every_route_has_budget(self):
+        names = {pattern.name for pattern in urlpatterns}
+        self.assertEqual(names - set(self.budgets), set())
+
+        # every budget must actually be checked by one of the tests below
+        self.check_event_budgets()
+        self.check_registration_budgets()
+        self.check_calendar_budgets()
+        self.check_account_budgets()
+        self.assertEqual(self.exercised_budgets, set(self.budgets))
+
+    def test_event_budgets(self):
+        self.check_event_budgets()
+
+    def test_registration_budgets(self):
+        self.check_registration_budgets()
+
+    def test_calendar_budgets(self):
+        self.check_calendar_budgets()
+
+    def test_account_budgets(self):
+        self.check_account_budgets()
+
+    def check_event_budgets(self):
+        self.client.force_authenticate(None)
+        event = self.events[0]
+        response = self.assertWithinBudget(
+            'event-list', self.client.get, reverse('events:event-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.assertWithinBudget(
+            'event-detail', self.client.get,
+            reverse('events:event-detail', kwargs={'pk': event.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def check_registration_budgets(self):
+        event = self.events[0]
+        self.client.force_authenticate(self.user)
+
+        response = self.assertWithinBudget(
+            'event-register', self.client.post,
+            reverse('events:event-register', kwargs={'pk': event.pk}))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.assertWithinBudget(
+            'event-cancel', self.client.delete,
+            reverse('events:event-cancel', kwargs={'pk': event.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.assertWithinBudget(
+            'my-registrations', self.client.get,
+            reverse('events:my-registrations'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        call_command('aggregate_registration_events', lag_seconds=0,
+                     stdout=StringIO())
+        self.client.force_authenticate(self.organizer)
+        response = self.assertWithinBudget(
+            'event-analytics', self.client.get,
+            reverse('events:event-analytics', kwargs={'pk': event.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def check_calendar_budgets(self):
+        self.client.force_authenticate(None)
+        response = self.assertWithinBudget(
+            'events-ics', lambda: b''.join(self.client.get(
+                reverse('events:events-ics')).streaming_content))
+        self.assertIn(b'BEGIN:VCALENDAR', response)
+
+        key = CalendarKey.objects.create(user=self.user).key
+        response = self.assertWithinBudget(
+            'my-registrations-ics', lambda: b''.join(self.client.get(
+                reverse('events:my-registrations-ics'),
+                {'key': key}).streaming_content))
+        self.assertEqual(response.count(b'BEGIN:VEVENT'),
+                         self.event_count - 1)
+
+    def check_account_budgets(self):
+        self.client.force_authenticate(None)
+        response = self.assertWithinBudget(
+            'home', self.client.get, reverse('events:home'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.assertWithinBudget(
+            'user-register', self.client.get,
+            reverse('events:user-register'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.assertWithinBudget(
+            'api-register', self.client.post, reverse('events:api-register'),
+            {'username': 'newuser', 'password': 'secret123'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.client.force_authenticate(self.user)
+        response = self.assertWithinBudget(
+            'api-token-for-user', self.client.get,
+            reverse('events:api-token-for-user'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.assertWithinBudget(
+            'api-calendar-key', self.client.get,
+            reverse('events:api-calendar-key'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class QueryBudgetTestCase(TestCase):
+    def setUp(self):
+        User.objects.create_user(username='user1', password='pass123')
+
+    def test_query_count_exceeded_reports_sql(self):
+        with self.assertRaises(BudgetExceeded) as cm:
+            with query_budget(max_queries=1, max_duplicates=None,
+                              label='two queries'):
+                User.objects.filter(username='user1').exists()
+                User.objects.count()
+        message = str(cm.exception)
+        self.assertIn('Budget exceeded for two queries', message)
+        self.assertIn('2 queries executed, budget is 1', message)
+        self.assertIn('SELECT COUNT(*)', message)
+        self.assertIn("'user1'", message)
+
+    def test_duplicates_exceeded(self):
+        with self.assertRaises(BudgetExceeded) as cm:
+            with query_budget(max_queries=10):
+                for _ in range(3):
+                    list(User.objects.filter(username='user1'))
+        message = str(cm.exception)
+        self.assertIn('2 duplicate queries, budget is 0', message)
+        self.assertIn('Duplicated:\n  x3 SELECT', message)
+
+    def test_wall_time_exceeded(self):
+        with self.assertRaises(BudgetExceeded) as cm:
+            with query_budget(max_seconds=0.001):
+                time.sleep(0.01)
+        self.assertIn('budget is 0.001s', str(cm.exception))
+
+    def test_within_budget_passes(self):
+        with query_budget(max_queries=1, max_seconds=5) as budget:
+            User.objects.count()
+        self.assertEqual(len(budget.queries), 1)
+
+    def test_decorator(self):
+        @query_budget(max_queries=0)
+        def count_users():
+            return User.objects.count()
+
+        with self.assertRaises(BudgetExceeded) as cm:
+            count_users()
+        self.assertIn('count_users', str(cm.exception))
+        self.assertIn('SELECT COUNT(*)', str(cm.exception))
+
+        within = query_budget(max_queries=1)(count_users.__wrapped__)
+        self.assertEqual(within(), 1)
+
+
+class CalendarFeedTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='user1', password='pass123')
+        self.organizer = User.objects.create_user(
+            username='org1', password='pass123', is_staff=True)
+        now = datetime.now(timezone.utc)
+        self.event = Event.objects.create(
+            title='Launch, party; v2', description='line one\nline two',
+            location='online', start_time=now,
+            end_time=now + timedelta(hours=1), capacity=5,
+            created_by=self.organizer)
+
+    def test_events_feed_and_conditional_get(self):
+        url: str = reverse('events:events-ics')
+        response = self.client.get(url, HTTP_ACCEPT='text/calendar')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/calendar'))
+        self.assertEqual(self.client.get(
+            url, HTTP_ACCEPT='application/json').status_code,
+            status.HTTP_200_OK)
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn(f'UID:event-{self.event.pk}@ers.local\r\n', body)
+        self.assertIn('SUMMARY:Launch\\, party\\; v2\r\n', body)
+        self.assertIn('DESCRIPTION:line one\\nline two\r\n', body)
+
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # a change to the table invalidates the ETag
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.title = 'Renamed'
+            self.event.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_my_registrations_feed_calendar_key(self):
+        url: str = reverse('events:my-registrations-ics')
+        response = self.client.get(url, HTTP_ACCEPT='text/calendar')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertIn('detail', response.json())
+        response = self.client.get(url, {'key': 'bad'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('detail', response.json())
+
+        # the API token is not accepted by the feed
+        token = Token.objects.create(user=self.user)
+        self.assertEqual(
+            self.client.get(url, {'token': token.key}).status_code,
+            status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(
+            self.client.get(url, {'key': token.key}).status_code,
+            status.HTTP_401_UNAUTHORIZED)
+
+        self.client.force_authenticate(self.user)
+        data = self.client.get(reverse('events:api-calendar-key')).json()
+        self.assertTrue(data['url'].endswith(f'?key={data["key"]}'))
+        self.client.force_authenticate(None)
+        key = data['key']
+
+        response = self.client.get(url, {'key': key})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self.assertNotIn(b'BEGIN:VEVENT',
+                         b''.join(response.streaming_content))
+
+        # another user's registration leaves this user's feed unchanged
+        with self.captureOnCommitCallbacks(execute=True):
+            Registration.objects.create(user=self.organizer, event=self.event)
+        response = self.client.get(url, {'key': key},
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Registration.objects.create(user=self.user, event=self.event)
+        response = self.client.get(url, {'key': key},
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(b'BEGIN:VEVENT', b''.join(response.streaming_content))
+
+    def test_calendar_key_grants_feed_only_and_is_revocable(self):
+        key = CalendarKey.objects.create(user=self.user).key
+        response = self.client.post(
+            reverse('events:event-register', kwargs={'pk': self.event.pk}),
+            QUERY_STRING=f'key={key}')
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED,
+                                             status.HTTP_403_FORBIDDEN))
+        self.assertFalse(Registration.objects.exists())
+
+        self.client.force_authenticate(self.user)
+        rotated = self.client.post(
+            reverse('events:api-calendar-key')).json()['key']
+        self.assertNotEqual(rotated, key)
+        self.client.delete(reverse('events:api-calendar-key'))
+        self.client.force_authenticate(None)
+
+        url: str = reverse('events:my-registrations-ics')
+        for old_key in (key, rotated):
+            response = self.client.get(url, {'key': old_key})
+            self.assertEqual(response.status_code,
+                             status.HTTP_401_UNAUTHORIZED)
+
+class ImportTimeTestCase(SimpleTestCase):
+    def test_parse_importtime(self):
+        output = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |   _io\n'
+            'import time:      2500 |      40000 | django.core.wsgi\n'
+            'unrelated line\n')
+        self.assertEqual(parse_importtime(output), [
+            ('_io', 120, 120), ('django.core.wsgi', 2500, 40000)])
+
+
+class CapacityTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='user1', password='pass123')
+        self.vip = User.objects.create_user(
+            username='vip1', password='pass123')
+        self.organizer = User.objects.create_user(
+            username='org1', password='pass123', is_staff=True)
+        now = datetime.now(timezone.utc)
+        self.event = Event.objects.create(
+            title='Capacity Event', description='desc', location='online',
+            start_time=now, end_time=now + timedelta(hours=1),
+            capacity=2, created_by=self.organizer)
+
+    def register(self, user):
+        self.client.force_authenticate(user)
+        return self.client.post(
+            reverse('events:event-register', kwargs={'pk': self.event.pk}))
+
+    def test_reserved_pool_and_overbooking(self):
+        pool = SeatPool.objects.create(event=self.event, name='VIP', seats=1)
+        pool.members.add(self.vip)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.spots_left, 1)
+
+        self.assertEqual(self.register(self.user).status_code,
+                         status.HTTP_201_CREATED)
+        # the only general seat is gone, the reserved one is not for user2
+        other = User.objects.create_user(username='user2', password='x')
+        self.assertEqual(self.register(other).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+        response = self.register(self.vip)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['pool'], pool.pk)
+        pool.refresh_from_db()
+        self.assertEqual(pool.seats_taken, 1)
+
+        # 50% overbooking adds one general seat on a capacity of 2
+        self.event.overbook_percent = 50
+        self.event.save()
+        self.assertEqual(self.register(other).status_code,
+                         status.HTTP_201_CREATED)
+        # saving the stale instance above kept the counter written via F()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.general_taken, 2)
+        self.assertEqual(self.event.spots_left, 0)
+
+    def test_capacity_reduction_checked_against_taken_seats(self):
+        self.register(self.user)
+        self.register(self.vip)
+        url: str = reverse('events:event-detail',
+                           kwargs={'pk': self.event.pk})
+
+        self.client.force_authenticate(self.organizer)
+        response = self.client.patch(url, {'capacity': 1}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('capacity', response.json())
+
+        response = self.client.patch(url, {'capacity': 3}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['spots_left'], 1)
+
+        self.client.force_authenticate(self.user)
+        response = self.client.patch(url, {'capacity': 10}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_capacity_reduction_checked_on_model_save(self):
+        self.register(self.user)
+        event = Event.objects.get(pk=self.event.pk)
+        event.capacity = 0
+        with self.assertRaises(ValidationError):
+            event.full_clean()
+        with self.assertRaises(CapacityError):
+            event.save()
+
+        event.refresh_from_db()
+        self.assertEqual((event.capacity, event.general_taken), (2, 1))
+        event.capacity = 1
+        event.full_clean()
+        event.save()
+
+    def test_save_after_delete_reinserts(self):
+        pool = SeatPool.objects.create(event=self.event, name='VIP', seats=1)
+        SeatPool.objects.filter(pk=pool.pk).delete()
+        pool.save()
+        self.assertTrue(SeatPool.objects.filter(pk=pool.pk).exists())
+
+        Event.objects.filter(pk=self.event.pk).delete()
+        self.event.save()
+        self.assertTrue(Event.objects.filter(pk=self.event.pk).exists())
+
+    def test_recompute_seats_command(self):
+        pool = SeatPool.objects.create(event=self.event, name='Staff',
+                                       seats=1)
+        Registration.objects.bulk_create([
+            Registration(user=self.user, event=self.event),
+            Registration(user=self.vip, event=self.event, pool=pool)])
+        Event.objects.update(general_taken=0, reserved_seats=0)
+
+        call_command('recompute_seats', batch_size=1, stdout=StringIO())
+
+        self.event.refresh_from_db()
+        pool.refresh_from_db()
+        self.assertEqual(self.event.general_taken, 1)
+        self.assertEqual(self.event.reserved_seats, 1)
+        self.assertEqual(pool.seats_taken, 1)
+        self.assertEqual(self.event.spots_left, 0)
+
+    def test_pool_size_checked_against_capacity(self):
+        with self.assertRaises(CapacityError):
+            SeatPool.objects.create(event=self.event, name='VIP', seats=50)
+
+        pool = SeatPool.objects.create(event=self.event, name='VIP', seats=1)
+        pool.members.add(self.vip)
+        self.register(self.vip)
+        self.register(self.user)
+
+        # the general seat is taken, so the pool cannot grow into it
+        pool.seats = 2
+        with self.assertRaises(ValidationError):
+            pool.full_clean()
+        with self.assertRaises(CapacityError):
+            pool.save()
+
+        pool.refresh_from_db()
+        pool.seats = 0
+        with self.assertRaises(CapacityError):
+            pool.save()
+
+    def test_overbook_percent_limited(self):
+        self.event.overbook_percent = 1000
+        with self.assertRaises(ValidationError):
+            self.event.full_clean()
+
+        self.client.force_authenticate(self.organizer)
+        response = self.client.patch(
+            reverse('events:event-detail', kwargs={'pk': self.event.pk}),
+            {'overbook_percent': 101}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cancel_with_drifted_counter(self):
+        # rows from before the counters existed leave them at 0
+        Registration.objects.bulk_create(
+            [Registration(user=self.user, event=self.event)])
+        self.client.force_authenticate(self.user)
+        response = self.client.delete(
+            reverse('events:event-cancel', kwargs={'pk': self.event.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.general_taken, 0)
+
+
+class RegistrationAnalyticsTestCase(APITestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user(
+            username='org1', password='pass123', is_staff=True)
+        self.users = [User.objects.create_user(
+            username=f'user{i}', password='pass123') for i in range(3)]
+        now = datetime.now(timezone.utc)
+        self.event = Event.objects.create(
+            title='Analytics Event', description='desc', location='online',
+            start_time=now, end_time=now + timedelta(hours=1),
+            capacity=10, created_by=self.organizer)
+
+    def aggregate(self):
+        call_command('aggregate_registration_events', lag_seconds=0,
+                     batch_size=2, stdout=StringIO())
+
+    def test_log_rollups_and_analytics(self):
+        for user in self.users:
+            self.client.force_authenticate(user)
+            self.client.post(reverse('events:event-register',
+                                     kwargs={'pk': self.event.pk}))
+        self.client.delete(reverse('events:event-cancel',
+                                   kwargs={'pk': self.event.pk}))
+        self.assertEqual(
+            list(RegistrationEvent.objects.values_list('action', flat=True)),
+            ['registered'] * 3 + ['cancelled'])
+
+        self.aggregate()
+        # a second run only folds in rows logged since the watermark
+        self.client.force_authenticate(self.users[-1])
+        self.client.post(reverse('events:event-register',
+                                 kwargs={'pk': self.event.pk}))
+        self.aggregate()
+        self.aggregate()
+
+        rollup = RegistrationRollup.objects.get(event=self.event)
+        self.assertEqual((rollup.registrations, rollup.cancellations),
+                         (4, 1))
+
+        url: str = reverse('events:event-analytics',
+                           kwargs={'pk': self.event.pk})
+        self.assertEqual(self.client.get(url).status_code,
+                         status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(self.organizer)
+        data = self.client.get(url).json()
+        self.assertEqual(data['registrations'], 4)
+        self.assertEqual(data['cancellations'], 1)
+        self.assertEqual(data['cancellation_rate'], 0.25)
+
+        for since in ('not-a-date', '2024-13-45T00:00:00'):
+            response = self.client.get(url, {'since': since})
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+
+        # naive datetimes are read in the current time zone
+        response = self.client.get(url, {'since': '2000-01-01T00:00:00'})
+        self.assertEqual(response.json()['registrations'], 4)
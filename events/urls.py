@@ -1,7 +1,9 @@
 from django.urls import path
 
 from .views import (EventDetailView, EventListCreateView, MyRegistrationsView,
-                    api_register, cancel_registration, register_event,
+                    api_register, calendar_key, cancel_registration,
+                    event_analytics, events_calendar,
+                    my_registrations_calendar, register_event,
                     token_for_user, user_register, home)
 
 app_name = 'events'
@@ -11,9 +13,16 @@ urlpatterns = [
     path('events/<int:pk>/', EventDetailView.as_view(), name='event-detail'),
     path('events/<int:pk>/register/', register_event, name='event-register'),
     path('events/<int:pk>/cancel/', cancel_registration, name='event-cancel'),
+    path('events/<int:pk>/analytics/', event_analytics,
+         name='event-analytics'),
     path('my-registrations/', MyRegistrationsView.as_view(),
          name='my-registrations'),
 
+    # iCalendar feeds for calendar app subscriptions
+    path('events.ics', events_calendar, name='events-ics'),
+    path('my-registrations.ics', my_registrations_calendar,
+         name='my-registrations-ics'),
+
     # web registration
     path('accounts/register/', user_register, name='user-register'),
     path('', home, name='home'),
@@ -21,4 +30,5 @@ urlpatterns = [
     # API signup and token-from-session endpoints
     path('api/register/', api_register, name='api-register'),
     path('api/token/', token_for_user, name='api-token-for-user'),
+    path('api/calendar-key/', calendar_key, name='api-calendar-key'),
 ]
@@ -0,0 +1,44 @@
+"""
+Per-table change versions kept in the Django cache.
+
+A version is bumped (after commit) whenever a row of a tracked table is saved
+or deleted, so a response derived from a table can be validated with a single
+cache lookup instead of a query. The cache must be shared by all workers in
+production (see CACHES in config/settings/prod.py).
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'events:table-version:{}'
+
+
+def get_version(table: str) -> int:
+    """Return the current change version of `table`."""
+    key = VERSION_KEY.format(table)
+    version = cache.get(key)
+    if version is None:
+        # seed from the clock so an evicted key never repeats an old version
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(table: str) -> None:
+    """Mark `table` as changed."""
+    key = VERSION_KEY.format(table)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def bump_on_commit(table: str) -> None:
+    """Bump `table` once the current transaction commits."""
+    transaction.on_commit(lambda: bump_version(table))
+
+
+def user_registrations_table(user_id: int) -> str:
+    """Version name tracking one user's registrations."""
+    return f'registration:user:{user_id}'
@@ -1,20 +1,36 @@
 import logging
 from datetime import datetime
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import UserCreationForm
 from django.db import IntegrityError, transaction
+from django.db.models import BooleanField, F, Value
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template import TemplateDoesNotExist
 from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils import timezone
+from django.utils.http import quote_etag
 from rest_framework import generics, permissions, status
 from rest_framework.authtoken.models import Token
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.decorators import (api_view, authentication_classes,
+                                       permission_classes, renderer_classes)
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
-from .models import Event, Registration
+from .authentication import CalendarKeyAuthentication
+from .capacity import has_seat_for
+from .ical import ICalendarRenderer, render_calendar
+from .models import (ArchivedRegistration, CalendarKey, Event,
+                     Registration, RegistrationEvent, RegistrationRollup)
 from .permissions import IsOrganizerOrReadOnly
-from .serializers import EventSerializer, RegistrationSerializer
+from .serializers import (EventSerializer, RegistrationRollupSerializer,
+                          RegistrationRowSerializer, RegistrationSerializer)
+from .versions import get_version, user_registrations_table
 
 logger = logging.getLogger(__name__)
 
@@ -36,7 +52,7 @@ def home(request):
 
 
 class EventListCreateView(generics.ListCreateAPIView):
-    queryset = Event.objects.all().order_by('-start_time')
+    queryset = Event.objects.select_related('created_by').order_by('-start_time')
     serializer_class = EventSerializer
     permission_classes = [IsOrganizerOrReadOnly]
 
@@ -44,10 +60,12 @@ class EventListCreateView(generics.ListCreateAPIView):
         serializer.save(created_by=self.request.user)
 
 
-# Event detail
-class EventDetailView(generics.RetrieveAPIView):
-    queryset = Event.objects.all()
+# Event detail; organizers may update it (capacity changes are validated
+# against the live seat counters by EventSerializer)
+class EventDetailView(generics.RetrieveUpdateAPIView):
+    queryset = Event.objects.select_related('created_by')
     serializer_class = EventSerializer
+    permission_classes = [IsOrganizerOrReadOnly]
 
 
 # register for event
@@ -60,23 +78,32 @@ def register_event(request, pk: int):
     """
     event = get_object_or_404(Event, pk=pk)
 
-    if event.spots_left <= 0:
+    if event.spots_left <= 0 and not event.reserved_seats:
         return Response({'error': 'Event is full'},
                         status=status.HTTP_400_BAD_REQUEST)
 
     try:
         with transaction.atomic():
-            # refresh to reduce race window
+            # refresh to reduce race window; the row lock serializes seat
+            # counter updates for this event
             event = Event.objects.select_for_update().get(pk=event.pk)
-            if event.spots_left <= 0:
+            available, pool = has_seat_for(event, request.user)
+            if not available:
                 return Response({'error': 'Event is full!'},
                                 status=status.HTTP_400_BAD_REQUEST)
 
-            reg, created = Registration.objects.get_or_create(
-                user=request.user, event=event)
+            # archived rows left the unique (user, event) guard behind
+            created = not ArchivedRegistration.objects.filter(
+                user=request.user, event=event).exists()
+            if created:
+                reg, created = Registration.objects.get_or_create(
+                    user=request.user, event=event, defaults={'pool': pool})
             if not created:
                 return Response({'error': 'Already registered!'},
                                 status=status.HTTP_400_BAD_REQUEST)
+            RegistrationEvent.objects.create(
+                event=event, user=request.user,
+                action=RegistrationEvent.REGISTERED)
 
             serializer = RegistrationSerializer(reg)
             logger.info('User %s registered for event %s',
@@ -104,8 +131,12 @@ def cancel_registration(request, pk: int):
     Cancel the authenticated user's registration for event `id`.
     """
     try:
-        reg = Registration.objects.get(user=request.user, event_id=pk)
-        reg.delete()
+        with transaction.atomic():
+            reg = Registration.objects.get(user=request.user, event_id=pk)
+            reg.delete()
+            RegistrationEvent.objects.create(
+                event_id=pk, user=request.user,
+                action=RegistrationEvent.CANCELLED)
         logger.info('User %s cancelled registration for event %s',
                     request.user, pk)
         return Response({'message': 'Registration cancelled!'},
@@ -121,14 +152,95 @@ def cancel_registration(request, pk: int):
                         status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+# organizer analytics
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def event_analytics(request, pk: int):
+    """
+    Hourly registrations and cancellations for event `id`, for its organizer
+    or staff. Optional `since` / `until` ISO datetimes bound the hours;
+    naive values are taken in the current time zone.
+
+    Reads only the rollup table filled by `aggregate_registration_events`,
+    so figures lag the live registrations until the next aggregation run.
+    """
+    event = get_object_or_404(Event.objects.only('created_by'), pk=pk)
+    if not (request.user.is_staff or event.created_by_id == request.user.pk):
+        return Response({'error': 'Only the organizer can view analytics!'},
+                        status=status.HTTP_403_FORBIDDEN)
+
+    rollups = RegistrationRollup.objects.filter(event_id=pk)
+    for param, lookup in (('since', 'hour__gte'), ('until', 'hour__lt')):
+        value = request.query_params.get(param)
+        if value is None:
+            continue
+        try:
+            # None when malformed, ValueError when out of range
+            moment = parse_datetime(value)
+        except ValueError:
+            moment = None
+        if moment is None:
+            return Response({'error': f'invalid {param} datetime'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if settings.USE_TZ and timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        rollups = rollups.filter(**{lookup: moment})
+
+    hours = RegistrationRollupSerializer(rollups, many=True).data
+    registrations = sum(hour['registrations'] for hour in hours)
+    cancellations = sum(hour['cancellations'] for hour in hours)
+    return Response({
+        'event': pk,
+        'registrations': registrations,
+        'cancellations': cancellations,
+        'cancellation_rate': (
+            round(cancellations / registrations, 4) if registrations else 0.0),
+        'hours': hours,
+    })
+
+
 # View user’s registrations
 class MyRegistrationsView(generics.ListAPIView):
+    """
+    List the authenticated user's registrations.
+
+    Pass `?include_archived=true` to also list registrations that were moved
+    to the archive table by the `archive_registrations` command.
+    """
     serializer_class = RegistrationSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def include_archived(self) -> bool:
+        value = self.request.query_params.get('include_archived', '')
+        return value.lower() in ('1', 'true', 'yes')
+
+    def get_serializer_class(self):
+        if self.include_archived():
+            return RegistrationRowSerializer
+        return RegistrationSerializer
+
     def get_queryset(self):
-        return Registration.objects.filter(
-            user=self.request.user).select_related('event')
+        registrations = Registration.objects.filter(user=self.request.user)
+        if not self.include_archived():
+            return registrations.select_related('user', 'event')
+
+        # one UNION query, ordered and paginated by the database
+        columns = ('reg_id', 'event_ref', 'pool_ref', 'registered_on',
+                   'archived')
+        live = registrations.order_by().annotate(
+            reg_id=F('pk'), event_ref=F('event_id'), pool_ref=F('pool_id'),
+            registered_on=F('registered_at'),
+            archived=Value(False, output_field=BooleanField()),
+        ).values(*columns)
+        archived = ArchivedRegistration.objects.filter(
+            user=self.request.user,
+        ).order_by().annotate(
+            reg_id=F('registration_id'), event_ref=F('event_id'),
+            pool_ref=F('pool_id'), registered_on=F('registered_at'),
+            archived=Value(True, output_field=BooleanField()),
+        ).values(*columns)
+        return live.union(archived, all=True).order_by(
+            '-registered_on', '-reg_id')
 
 
 def user_register(request):
@@ -187,3 +299,85 @@ def token_for_user(request):
     """
     token, _ = Token.objects.get_or_create(user=request.user)
     return Response({'token': token.key})
+
+
+def calendar_response(request, etag: str, events, name: str):
+    """
+    Answer `304` when the client already holds `etag`, otherwise stream the
+    iCalendar feed for `events`.
+    """
+    etag = quote_etag(etag)
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+
+    response = StreamingHttpResponse(
+        render_calendar(events, name),
+        content_type='text/calendar; charset=utf-8')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    response['Content-Disposition'] = f'inline; filename="{name}.ics"'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+@renderer_classes([ICalendarRenderer, JSONRenderer])
+def events_calendar(request):
+    """
+    iCalendar feed of all events.
+
+    The ETag is the event table's change version, so unchanged polls are
+    answered with `304` after a cache lookup, without querying events.
+    """
+    etag = f'events-{get_version("event")}'
+    events = Event.objects.only(
+        'title', 'description', 'location', 'start_time', 'end_time',
+    ).order_by('start_time').iterator()
+    return calendar_response(request, etag, events, 'events')
+
+
+@api_view(['GET'])
+@authentication_classes([CalendarKeyAuthentication, SessionAuthentication])
+@permission_classes([permissions.IsAuthenticated])
+@renderer_classes([ICalendarRenderer, JSONRenderer])
+def my_registrations_calendar(request):
+    """
+    iCalendar feed of the events the authenticated user registered for.
+
+    Calendar apps authenticate with `?key=<calendar key>` (see
+    `calendar_key`); API tokens are not accepted here.
+    """
+    etag = (f'my-registrations-{request.user.pk}-'
+            f'{get_version(user_registrations_table(request.user.pk))}-'
+            f'{get_version("event")}')
+    events = Event.objects.filter(
+        registrations__user=request.user,
+    ).only(
+        'title', 'description', 'location', 'start_time', 'end_time',
+    ).order_by('start_time').iterator()
+    return calendar_response(request, etag, events, 'my-registrations')
+
+
+@api_view(['GET', 'POST', 'DELETE'])
+@permission_classes([permissions.IsAuthenticated])
+def calendar_key(request):
+    """
+    Manage the key for the user's personal calendar feed.
+
+    GET returns the key and feed URL (creating the key if needed), POST
+    rotates it and DELETE revokes it.
+    """
+    if request.method == 'DELETE':
+        CalendarKey.objects.filter(user=request.user).delete()
+        return Response({'message': 'Calendar key revoked!'},
+                        status=status.HTTP_200_OK)
+
+    key, created = CalendarKey.objects.get_or_create(user=request.user)
+    if request.method == 'POST' and not created:
+        key.key = CalendarKey.generate_key()
+        key.save(update_fields=['key'])
+
+    url = request.build_absolute_uri(
+        reverse('events:my-registrations-ics')) + f'?key={key.key}'
+    return Response({'key': key.key, 'url': url})